@@ -1,35 +1,201 @@
 # server.py
-import asyncio, json, time
-from typing import List, Set
+import asyncio, functools, threading, time
+import msgspec, orjson, websockets
+from typing import List, Optional, Set, Tuple
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Body
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
 
 from inspire_hand import InspireHand  # your class
 
 hand = InspireHand(port="/dev/ttyCH341USB0", baudrate=115200, slave_id=1, debug=False)
 
-subscribers: Set[WebSocket] = set()
+# --------- SUBSCRIBERS: set + tuple snapshot rebuilt only on change ---------
+class SubSet:
+    # add/discard and snapshot() all run on the event loop, so no lock
+    def __init__(self):
+        self._set: Set[WebSocket] = set()
+        self._snapshot: Tuple[WebSocket, ...] = ()
+        self._nonempty = asyncio.Event()
+
+    def add(self, ws):
+        if ws not in self._set:
+            self._set.add(ws)
+            self._snapshot = tuple(self._set)
+            self._nonempty.set()
+
+    def discard(self, ws):
+        if ws in self._set:
+            self._set.discard(ws)
+            self._snapshot = tuple(self._set)
+            if not self._set:
+                self._nonempty.clear()
+
+    async def wait_nonempty(self):
+        await self._nonempty.wait()
+
+    def snapshot(self):
+        return self._snapshot
+
+    def __contains__(self, ws):
+        return ws in self._set
+
+    def __len__(self):
+        return len(self._set)
+
+subscribers = SubSet()
+msgpack_subscribers: Set[WebSocket] = set()  # negotiated MSGPACK_SUBPROTOCOL
+modbus_lock = asyncio.Lock()  # one request in flight on the RS-485 bus
 telemetry_period = 0.2  # 5 Hz push to clients
+send_timeout = 2.0      # s; a client stalled this long is dropped and closed
+_bg_tasks: Set[asyncio.Task] = set()  # strong refs for fire-and-forget closes
 manual_speed = 600      # 0..1000
 
+async def to_thread_fast(fn, *args, **kwargs):
+    """
+    asyncio.to_thread without the contextvars.copy_context() wrapper;
+    nothing here sets contextvars, so the copy is pure overhead per hop.
+    """
+    if kwargs:
+        fn = functools.partial(fn, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
 def clamp(v, lo=0, hi=1000):
     try:
         return max(lo, min(hi, int(v)))
     except Exception:
         return lo
 
+def sanitize_angles(angles):
+    """
+    Validate + clamp ONCE at ingress so the driver can write as-is.
+    Returns 6 ints in 0..1000, or None if the frame is malformed.
+    """
+    if not isinstance(angles, list) or len(angles) != 6:
+        return None
+    try:
+        return [max(0, min(1000, int(v))) for v in angles]
+    except (TypeError, ValueError, OverflowError):  # OverflowError: int(inf)
+        return None
+
+# --------- TELEMETRY REGISTERS (two documented blocks) ---------
+# ANGLE_ACT/FORCE_ACT are 6 x int16; STATUS/TEMP are 6 bytes packed
+# low-byte-first into 3 registers. 1552..1581 is undocumented, so the
+# angles are read on their own and FORCE_ACT..TEMP (incl. CURRENT/ERROR)
+# in a second read: 2 round-trips instead of 4.
+ANGLE_ACT = 1546
+FORCE_ACT = 1582
+STATUS    = 1612
+TEMP      = 1618
+TAIL_COUNT = TEMP + 3 - FORCE_ACT
+
+# cleared at startup if the register decoding disagrees with the getters
+batched_telemetry = True
+
+def _s16(v):
+    return v - 0x10000 if v & 0x8000 else v
+
+def _unpack_bytes(regs):
+    out = []
+    for r in regs:
+        out += (r & 0xFF, (r >> 8) & 0xFF)
+    return out
+
+def _read_telemetry_getters():
+    return (
+        hand.get_finger_forces(),
+        hand.get_finger_temperatures(),
+        list(map(int, hand.get_finger_statuses())),
+        hand.get_finger_angles(),
+    )
+
+def _read_telemetry_batched():
+    """Returns (forces, temps, status, angles), or None if either read fails."""
+    try:
+        ang = hand.modbus.read_holding_registers(ANGLE_ACT, 6)
+        tail = hand.modbus.read_holding_registers(FORCE_ACT, TAIL_COUNT)
+    except Exception as e:
+        print("[telemetry] batched read failed:", e, flush=True)
+        return None
+    if not ang or not tail or len(ang) != 6 or len(tail) != TAIL_COUNT:
+        return None
+
+    def block(addr, n):
+        i = addr - FORCE_ACT
+        return tail[i:i + n]
+
+    angles = [_s16(v) for v in ang]
+    forces = [_s16(v) for v in block(FORCE_ACT, 6)]
+    status = _unpack_bytes(block(STATUS, 3))
+    temps  = _unpack_bytes(block(TEMP, 3))
+    return forces, temps, status, angles
+
+def read_all_telemetry():
+    """
+    Batched register reads, falling back to the InspireHand getters if
+    they fail or were disabled at startup. Runs in a worker thread.
+    Returns (forces, temps, status, angles).
+    """
+    if batched_telemetry:
+        regs = _read_telemetry_batched()
+        if regs is not None:
+            return regs
+    return _read_telemetry_getters()
+
+def check_batched_telemetry():
+    """
+    Startup check (hand idle): the batched decoding must agree with the
+    InspireHand getters on temps and status exactly, angles within ±2 and
+    forces within ±50 (idle readings drift between the two reads; this
+    catches a gross scale error, and a sign error on any loaded finger),
+    otherwise telemetry keeps using the getters. A read error here only disables the batched path.
+    """
+    global batched_telemetry
+    try:
+        batched = _read_telemetry_batched()
+        ref = _read_telemetry_getters()
+    except Exception as e:
+        print("[startup] telemetry self-check failed:", e, "; using getters", flush=True)
+        batched_telemetry = False
+        return
+    ok = (
+        batched is not None
+        and all(abs(a - b) <= 50 for a, b in zip(batched[0], ref[0]))
+        and list(batched[1]) == list(ref[1])
+        and list(batched[2]) == list(ref[2])
+        and all(abs(a - b) <= 2 for a, b in zip(batched[3], ref[3]))
+    )
+    batched_telemetry = ok
+    if not ok:
+        print("[startup] batched telemetry disagrees with getters; using getters", flush=True)
+
+# --------- TELEMETRY WIRE FORMAT ---------
+# always binary frames (skips the text path's utf-8 handling): clients that
+# offer this subprotocol get msgpack, everyone else {"telemetry": {...}} JSON
+MSGPACK_SUBPROTOCOL = "hand.msgpack.v1"
+
+class Telemetry(msgspec.Struct):
+    t: float
+    forces: List[int]
+    temps: List[int]
+    status: List[int]
+    angles: List[int]
+    speed: int
+
+ENC = msgspec.msgpack.Encoder()
+
 # --------- LATEST-ONLY MAILBOX (capacity=1) ---------
 class LatestOnly:
+    # no lock: everything runs on one event loop and there is no await
+    # between reading and clearing the slot, so put/get can't interleave
     def __init__(self):
         self._item = None
         self._event = asyncio.Event()
-        self._lock = asyncio.Lock()
 
-    async def put(self, item):
-        async with self._lock:
-            self._item = item
-            self._event.set()
+    def put_nowait(self, item):
+        self._item = item
+        self._event.set()
 
     async def get(self, timeout=None):
         if timeout is not None:
@@ -39,19 +205,71 @@ class LatestOnly:
                 return None
         else:
             await self._event.wait()
-        async with self._lock:
-            it = self._item
-            self._item = None
-            self._event.clear()
-            return it
+        it = self._item
+        self._item = None
+        self._event.clear()
+        return it
 
 desired_angles = LatestOnly()
 
-# --------- DRIVER: the ONLY place that touches Modbus ---------
+# --------- COMMAND QUEUE: ("speed", int) | ("open",) | ("close",) ---------
+# items are (cmd, [Future]); the futures resolve once the command is written
+cmd_q: asyncio.Queue = asyncio.Queue()
+
+def drain_commands():
+    """
+    Empties cmd_q, keeping order. A run of back-to-back "speed" commands
+    collapses to the newest (superseded ones share its result); a speed
+    on the far side of an open/close is kept so that command runs at the
+    speed that was set before it.
+    """
+    cmds = []
+    while not cmd_q.empty():
+        cmd, futs = cmd_q.get_nowait()
+        if cmd[0] == "speed" and cmds and cmds[-1][0][0] == "speed":
+            futs = cmds.pop()[1] + futs
+        cmds.append((cmd, futs))
+    return cmds
+
+def _resolve(futs, exc=None):
+    for f in futs:
+        try:
+            if exc is None:
+                f.set_result(None)
+            else:
+                f.set_exception(exc)
+        except InvalidStateError:
+            pass  # already resolved
+
+def apply_tick(cmds, arr):
+    """
+    Everything the driver does in one tick, run in ONE worker-thread hop:
+    queued commands first (each on its own, so one failure can't swallow
+    the rest), then the ANGLE_SET block write (if any).
+    """
+    for cmd, futs in cmds:
+        op = cmd[0]
+        try:
+            if op == "speed":
+                hand.set_all_finger_speeds(cmd[1])
+            elif op == "open":
+                hand.open_all_fingers()
+            elif op == "close":
+                hand.close_all_fingers()
+        except Exception as e:
+            print(f"[driver] {op} failed:", e, flush=True)
+            _resolve(futs, e)
+        else:
+            _resolve(futs)
+    if arr is not None:
+        # write ANGLE_SET block (base 1486) in one go
+        hand.modbus.write_multiple_registers(1486, arr)
+
+# --------- DRIVER: the ONLY place that writes to Modbus ---------
 async def driver_loop():
     """
-    Runs at a fixed cadence; coalesces to the latest angles and
-    performs ONE batched write per tick in a worker thread.
+    Runs at a fixed cadence; coalesces to the latest angles plus any
+    queued commands and performs ONE batched hop per tick in a worker thread.
     """
     # safe, conservative device rate (10 Hz)
     period = 0.10  # seconds
@@ -63,112 +281,347 @@ async def driver_loop():
         latest = await desired_angles.get(timeout=period)
         target = latest if latest is not None else last_sent
 
+        arr = None
         if target is not None:
-            # clamp and send as a single multi-register write
-            arr = [clamp(x) for x in target[:6]]
-            try:
-                # write ANGLE_SET block (base 1486) in one go
-                # run in thread so the event loop stays responsive
-                await asyncio.to_thread(hand.modbus.write_multiple_registers, 1486, arr)
-                last_sent = arr
-            except Exception as e:
-                print("[driver] write failed:", e, flush=True)
+            # already sanitized at ingress; send as a single multi-register write
+            arr = target
+            # skip if already on the wire (hold position / ±1 UI dither)
+            if last_sent is not None and all(abs(a - b) <= 1 for a, b in zip(arr, last_sent)):
+                arr = None
+
+        async with modbus_lock:
+            # drain under the lock so estop_now can't be overtaken by
+            # commands queued before it
+            cmds = drain_commands()
+            if any(cmd[0] in ("open", "close") for cmd, _ in cmds):
+                # they rewrite ANGLE_SET behind our back: forget what is on
+                # the wire so the next pose frame is written even if unchanged
+                last_sent = None
+            if cmds or arr is not None:
+                try:
+                    # run in thread so the event loop stays responsive
+                    await to_thread_fast(apply_tick, cmds, arr)
+                    if arr is not None:
+                        last_sent = arr
+                except Exception as e:
+                    print("[driver] write failed:", e, flush=True)
 
         # finish tick
         dt = time.monotonic() - t0
         await asyncio.sleep(max(0.0, period - dt))
 
-# --------- TELEMETRY: also offloaded to threads ---------
+# --------- MODBUS THREAD: own event loop, isolated from HTTP/WS load ---------
+# driver_loop, desired_angles, cmd_q and modbus_lock all live on this loop;
+# the FastAPI loop only talks to it through put_angles/put_command/on_modbus_loop
+modbus_loop: Optional[asyncio.AbstractEventLoop] = None
+_modbus_stop: Optional[asyncio.Event] = None
+_modbus_thread: Optional[threading.Thread] = None
+
+async def _modbus_main(ready: threading.Event):
+    global modbus_loop, _modbus_stop
+    modbus_loop = asyncio.get_running_loop()
+    _modbus_stop = asyncio.Event()
+
+    # small dedicated pool for serial I/O: one RS-485 bus can't go faster
+    # with more threads; 2 lets a queued write overlap a read hand-off
+    executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="modbus")
+    modbus_loop.set_default_executor(executor)
+
+    drv = asyncio.create_task(driver_loop())
+    ready.set()
+    try:
+        await _modbus_stop.wait()
+    finally:
+        drv.cancel()
+        try:
+            await drv
+        except asyncio.CancelledError:
+            pass
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def start_modbus_thread(timeout=5.0):
+    """Starts the Modbus thread; raises if its loop fails to come up."""
+    global _modbus_thread
+    ready = threading.Event()
+    error = []
+
+    def run():
+        try:
+            asyncio.run(_modbus_main(ready))
+        except BaseException as e:
+            error.append(e)
+            print("[modbus] loop stopped with error:", e, flush=True)
+        finally:
+            ready.set()  # never leave start_modbus_thread waiting
+
+    _modbus_thread = threading.Thread(target=run, name="modbus-loop", daemon=True)
+    _modbus_thread.start()
+    if not ready.wait(timeout):
+        raise RuntimeError("modbus loop did not start")
+    if error:
+        raise RuntimeError("modbus loop failed to start") from error[0]
+
+def stop_modbus_thread(timeout=2.0):
+    """
+    Stops the Modbus thread. Returns True once it has exited; asyncio.run
+    waits for in-flight executor work on the way out, so the serial port
+    is then safe to close.
+    """
+    if _modbus_thread is None or not _modbus_thread.is_alive():
+        return True
+    if modbus_loop is not None and _modbus_stop is not None:
+        try:
+            modbus_loop.call_soon_threadsafe(_modbus_stop.set)
+        except RuntimeError:
+            pass  # loop already closed; the thread is on its way out
+    _modbus_thread.join(timeout)
+    return not _modbus_thread.is_alive()
+
+def put_angles(angles):
+    """
+    Fire-and-forget: hand sanitized angles to the driver's mailbox (one
+    callback per frame, no coroutine/Task/Future). Returns False if the
+    Modbus loop isn't running (e.g. during shutdown).
+    """
+    if modbus_loop is None:
+        return False
+    try:
+        modbus_loop.call_soon_threadsafe(desired_angles.put_nowait, angles)
+    except RuntimeError:  # loop closed
+        return False
+    return True
+
+def put_command(cmd):
+    """
+    Queue a command for the driver's next tick. Returns an awaitable that
+    completes once it is written (or raises the write error).
+    """
+    fut = Future()
+    modbus_loop.call_soon_threadsafe(cmd_q.put_nowait, (cmd, [fut]))
+    return asyncio.wrap_future(fut)
+
+async def estop_now():
+    """
+    Runs on the Modbus loop. E-stop doesn't wait for the next tick: it only
+    waits for the request already on the bus, fails any speed commands
+    queued before it (applying them later would undo the stop), then
+    writes speed 0 right away.
+    """
+    async with modbus_lock:
+        for cmd, futs in drain_commands():
+            if cmd[0] == "speed":
+                _resolve(futs, RuntimeError("superseded by estop"))
+            else:
+                cmd_q.put_nowait((cmd, futs))
+        await to_thread_fast(hand.set_all_finger_speeds, 0)
+
+def on_modbus_loop(coro):
+    """Run coro on the Modbus loop; the result is awaitable from the caller's loop."""
+    return asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, modbus_loop))
+
+async def read_telemetry():
+    """
+    Runs on the Modbus loop. Telemetry yields to the driver: if the bus
+    stays busy for half a period, return None and skip this tick rather
+    than delay the next write.
+    """
+    try:
+        await asyncio.wait_for(modbus_lock.acquire(), telemetry_period * 0.5)
+    except asyncio.TimeoutError:
+        return None
+    try:
+        return await to_thread_fast(read_all_telemetry)
+    finally:
+        modbus_lock.release()
+
+async def _close_quietly(ws):
+    try:
+        await ws.close()
+    except Exception:
+        pass
+
+def drop_subscriber(ws):
+    """
+    Stop sending telemetry to ws AND close it, so its ws_angles handler
+    ends too instead of leaving a connected client that never hears back.
+    """
+    subscribers.discard(ws)
+    msgpack_subscribers.discard(ws)
+    task = asyncio.create_task(_close_quietly(ws))
+    _bg_tasks.add(task)
+    task.add_done_callback(_bg_tasks.discard)
+
+# --------- TELEMETRY: read on the Modbus loop, fan out on this one ---------
 async def telemetry_loop():
     global telemetry_period
     while True:
+        # idle server: park here instead of waking every period
+        await subscribers.wait_nonempty()
         await asyncio.sleep(telemetry_period)
         if not subscribers or not hand.is_connected:
             continue
         try:
-            forces = await asyncio.to_thread(hand.get_finger_forces)
-            temps  = await asyncio.to_thread(hand.get_finger_temperatures)
-            status = await asyncio.to_thread(lambda: list(map(int, hand.get_finger_statuses())))
-            angles = await asyncio.to_thread(hand.get_finger_angles)
-            payload = {
-                "telemetry": {
-                    "t": time.time(),
-                    "forces": forces,
-                    "temps": temps,
-                    "status": status,
-                    "angles": angles,
-                    "speed": manual_speed,
-                }
-            }
-            dead = []
-            for ws in list(subscribers):
-                try:
-                    await ws.send_text(json.dumps(payload))
-                except Exception:
-                    dead.append(ws)
-            for ws in dead:
-                subscribers.discard(ws)
+            regs = await on_modbus_loop(read_telemetry())
+            if regs is None:
+                continue
+            forces, temps, status, angles = regs
+            tele = Telemetry(
+                t=time.time(),
+                forces=forces,
+                temps=temps,
+                status=status,
+                angles=angles,
+                speed=manual_speed,
+            )
+            # encode once per format; every subscriber shares the same frame
+            packed = ENC.encode(tele) if msgpack_subscribers else None
+            raw = None
+            if len(msgpack_subscribers) < len(subscribers):
+                raw = orjson.dumps({"telemetry": msgspec.structs.asdict(tele)})
+            # fan out concurrently so one slow client can't stall the rest.
+            # A send that fails, or stalls past send_timeout (wait_for may cut
+            # it mid-frame, so the stream can't be trusted), drops AND closes
+            # that client; a brief hiccup shorter than that is tolerated.
+            targets = subscribers.snapshot()
+            results = await asyncio.gather(
+                *(
+                    asyncio.wait_for(
+                        ws.send_bytes(packed if ws in msgpack_subscribers else raw),
+                        send_timeout,
+                    )
+                    for ws in targets
+                ),
+                return_exceptions=True,
+            )
+            for ws, res in zip(targets, results):
+                if isinstance(res, Exception):
+                    drop_subscriber(ws)
         except Exception as e:
             print("[telemetry] error:", e, flush=True)
 
+# --------- BRIDGE (port 8765): feeds the mailbox in-process ---------
+# replaces the old ws_bridge.py process that re-POSTed every frame to /api/angles
+BRIDGE_HOST = "0.0.0.0"
+BRIDGE_PORT = 8765
+
+async def bridge_handler(conn):
+    async for msg in conn:
+        try:
+            angles = sanitize_angles(orjson.loads(msg).get("angles"))
+            if angles is None:
+                await conn.send('{"ok":false,"error":"need 6 angles"}')
+            elif put_angles(angles):
+                await conn.send('{"ok":true}')
+            else:
+                await conn.send('{"ok":false,"error":"driver not running"}')
+        except Exception as e:
+            await conn.send(orjson.dumps({"ok": False, "error": str(e)}).decode())
+
 # ------------------ lifespan ------------------
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # startup
     hand.open()
-    hand.set_all_finger_speeds(manual_speed)
-    hand.set_all_finger_forces(500)
-    print("[startup] hand connected", flush=True)
-
-    # start background tasks
-    drv = asyncio.create_task(driver_loop())
-    tel = asyncio.create_task(telemetry_loop())
+    bridge = tel = None
     try:
+        hand.set_all_finger_speeds(manual_speed)
+        hand.set_all_finger_forces(500)
+        print("[startup] hand connected", flush=True)
+        check_batched_telemetry()
+
+        # bind the bridge first: if 8765 is taken (e.g. an old ws_bridge.py
+        # still running) startup fails before any background work exists
+        bridge = await websockets.serve(bridge_handler, BRIDGE_HOST, BRIDGE_PORT, compression=None)
+        # start background tasks; the driver runs on its own thread + loop
+        start_modbus_thread()
+        tel = asyncio.create_task(telemetry_loop())
         yield
     finally:
-        for task in (drv, tel):
-            task.cancel()
+        if bridge is not None:
+            bridge.close()
+            await bridge.wait_closed()
+        if tel is not None:
+            tel.cancel()
             try:
-                await task
+                await tel
             except asyncio.CancelledError:
                 pass
-        if hand.is_connected:
+        if not stop_modbus_thread():
+            # a worker may still be mid-request; closing now would yank the port
+            print("[shutdown] modbus thread still busy; leaving port open", flush=True)
+        elif hand.is_connected:
             hand.close()
-        print("[shutdown] hand disconnected", flush=True)
+            print("[shutdown] hand disconnected", flush=True)
 
 app = FastAPI(lifespan=lifespan)
 
+# UI origins: the built app on the robot host and the CRA dev server
+ALLOWED_ORIGINS = [
+    "http://192.168.100.142",
+    "http://192.168.100.142:3000",
+    "http://localhost:3000",
+]
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
+    allow_origins=ALLOWED_ORIGINS,
+    allow_credentials=False,  # no cookies are used
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
 # ------------------ routes ------------------
+COMMAND_TIMEOUT = 1.0  # s; a few driver ticks
+
+def _log_late_failure(fut):
+    if not fut.cancelled() and fut.exception() is not None:
+        print("[WS] command failed after timeout:", fut.exception(), flush=True)
+
+async def reply_when_written(ws, pending, ok_text):
+    """
+    ACK only once the command reached the hand; report write errors back.
+    The timeout bounds the reply, NOT the command: it is shielded so it
+    still runs (an e-stop must never be cancelled), and the client is
+    told it is still pending.
+    """
+    try:
+        await asyncio.wait_for(asyncio.shield(pending), COMMAND_TIMEOUT)
+    except asyncio.TimeoutError:
+        pending.add_done_callback(_log_late_failure)
+        await ws.send_text('{"ok":true,"pending":true}')
+    except Exception as e:
+        err = str(e) or type(e).__name__
+        await ws.send_text(orjson.dumps({"ok": False, "error": err}).decode())
+    else:
+        await ws.send_text(ok_text)
+
 @app.post("/api/angles")
 async def post_angles(payload: dict = Body(...)):
-    angles = payload.get("angles")
-    if isinstance(angles, list) and len(angles) == 6:
+    angles = sanitize_angles(payload.get("angles"))
+    if angles is not None:
         # do NOT write here; just update desired state
-        await desired_angles.put(angles)
-        return {"ok": True}
+        if put_angles(angles):
+            return {"ok": True}
+        return {"ok": False, "error": "driver not running"}
     return {"ok": False, "error": "need 6 angles"}
 
 @app.websocket("/ws")
 async def ws_angles(ws: WebSocket):
-    await ws.accept()
+    binary = MSGPACK_SUBPROTOCOL in ws.scope.get("subprotocols", [])
+    await ws.accept(subprotocol=MSGPACK_SUBPROTOCOL if binary else None)
     subscribers.add(ws)
+    if binary:
+        msgpack_subscribers.add(ws)
     try:
         while True:
-            data = json.loads(await ws.receive_text())
+            data = orjson.loads(await ws.receive_text())
 
             if "angles" in data:
-                angles = data["angles"]
-                if isinstance(angles, list) and len(angles) == 6:
+                angles = sanitize_angles(data["angles"])
+                if angles is not None:
                     # do NOT write here
-                    await desired_angles.put(angles)
+                    if not put_angles(angles):
+                        await ws.send_text('{"ok":false,"error":"driver not running"}')
                     # (optional) no echo to avoid backpressure
                 else:
                     await ws.send_text('{"ok":false,"error":"need 6 angles"}')
@@ -176,12 +629,10 @@ async def ws_angles(ws: WebSocket):
             elif data.get("cmd") == "set_speed":
                 global manual_speed
                 manual_speed = clamp(data.get("value", 600))
-                try:
-                    await asyncio.to_thread(hand.set_all_finger_speeds, manual_speed)
-                except Exception as e:
-                    await ws.send_text(json.dumps({"ok": False, "error": str(e)}))
-                else:
-                    await ws.send_text(json.dumps({"ok": True, "speed": manual_speed}))
+                # do NOT write here; the driver applies it next tick
+                await reply_when_written(
+                    ws, put_command(("speed", manual_speed)), f'{{"ok":true,"speed":{manual_speed}}}'
+                )
 
             elif data.get("cmd") == "set_telemetry_rate_hz":
                 global telemetry_period
@@ -191,19 +642,16 @@ async def ws_angles(ws: WebSocket):
                     hz = 5.0
                 hz = max(0.5, min(50.0, hz))
                 telemetry_period = 1.0 / hz
-                await ws.send_text(json.dumps({"ok": True, "telemetry_hz": hz}))
+                await ws.send_text(f'{{"ok":true,"telemetry_hz":{hz}}}')
 
             elif data.get("cmd") == "estop":
-                await asyncio.to_thread(hand.set_all_finger_speeds, 0)
-                await ws.send_text('{"ok":true,"estop":true}')
+                await reply_when_written(ws, on_modbus_loop(estop_now()), '{"ok":true,"estop":true}')
 
             elif data.get("cmd") == "open":
-                await asyncio.to_thread(hand.open_all_fingers)
-                await ws.send_text('{"ok":true}')
+                await reply_when_written(ws, put_command(("open",)), '{"ok":true}')
 
             elif data.get("cmd") == "close":
-                await asyncio.to_thread(hand.close_all_fingers)
-                await ws.send_text('{"ok":true}')
+                await reply_when_written(ws, put_command(("close",)), '{"ok":true}')
 
             else:
                 await ws.send_text('{"ok":false,"error":"unknown message"}')
@@ -214,6 +662,7 @@ async def ws_angles(ws: WebSocket):
         print("[WS] error:", e, flush=True)
     finally:
         subscribers.discard(ws)
+        msgpack_subscribers.discard(ws)
         try:
             await ws.close()
         except Exception:
@@ -221,4 +670,13 @@ async def ws_angles(ws: WebSocket):
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("server:app", host="0.0.0.0", port=8000, reload=False)
+    uvicorn.run(
+        "server:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",      # libuv loop: lower per-callback cost / tick jitter
+        http="httptools",
+        ws="websockets",
+        ws_per_message_deflate=False,  # ~100 B numeric frames: zlib costs more than it saves
+        reload=False,
+    )
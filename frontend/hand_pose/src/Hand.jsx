@@ -94,7 +94,9 @@ export default function HandTeleop() {
   // Open WebSocket
   useEffect(() => {
     const ws = new WebSocket(WS_URL);
+    ws.binaryType = "arraybuffer"; // telemetry arrives as binary JSON frames
     wsRef.current = ws;
+    const decoder = new TextDecoder();
 
     ws.onopen = () => {
       setWsOpen(true);
@@ -107,7 +109,8 @@ export default function HandTeleop() {
     ws.onmessage = (e) => {
       const now = performance.now();
       try {
-        const data = JSON.parse(e.data);
+        const text = typeof e.data === "string" ? e.data : decoder.decode(e.data);
+        const data = JSON.parse(text);
         if (data.telemetry) {
           const t = data.telemetry;
           if (Array.isArray(t.forces)) setForces(t.forces);